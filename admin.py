@@ -1,18 +1,30 @@
 #!/usr/bin/env python3
-import os, time, logging
+import os, time, logging, threading, itertools, hashlib, html, queue, atexit, zlib
+from collections import deque
+import cachetools, boto3, redis
+from datetime import timedelta
 from dotenv import load_dotenv
 from flask import (
-    Flask, Response, render_template_string,
-    redirect, url_for, request, flash
+    Flask, Response,
+    redirect, url_for, request, flash, get_flashed_messages, stream_with_context
 )
+from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, update
+from sqlalchemy.orm import make_transient
 from flask_login import (
     LoginManager, UserMixin, login_user,
     login_required, logout_user, current_user
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from logging.handlers import RotatingFileHandler
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from logging.handlers import WatchedFileHandler, MemoryHandler, QueueHandler, QueueListener
 from flask_mail import Mail
+from botocore.exceptions import ClientError
+from inotify_simple import INotify, flags
+from logutils import RepeatFilter, start_log_flusher, read_available, sse_event, LOG_WATCH_FLAGS, SSE_DEBOUNCE_S
+from dbutils import thread_conn
 
 # ------------------------------------------------------------------
 # Load environment
@@ -27,11 +39,32 @@ app.config["SESSION_COOKIE_DOMAIN"] = ".emits.ai"
 app.config["SESSION_COOKIE_SAMESITE"] = "None"
 app.config["SESSION_COOKIE_SECURE"] = True
 
+# Server-side sessions: the cookie carries only a random 256-bit session id, the payload
+# lives in Redis. (No SESSION_USE_SIGNER: Flask-Session deprecates it, and an id that
+# size can't be guessed anyway.)
+app.config["SESSION_TYPE"] = "redis"
+app.config["SESSION_REDIS"] = redis.Redis(connection_pool=redis.BlockingConnectionPool(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    max_connections=64,
+    socket_keepalive=True,
+))
+app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(hours=8)
+Session(app)
+
 # ------------------------------------------------------------------
 # Database Configuration
 # ------------------------------------------------------------------
 app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "query_cache_size": 1200,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_use_lifo": True,  # hot connections stay hot; idle extras age out via pool_recycle
+}
 db = SQLAlchemy(app)
 
 # ------------------------------------------------------------------
@@ -41,16 +74,31 @@ if not os.path.exists("logs"):
     os.mkdir("logs")
 
 log_path= "/home/ubuntu/partyprint-demo/partyprint.log"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # WARNING in production cuts write volume
 
-file_handler = RotatingFileHandler(log_path, maxBytes=10 * 1024 * 1024, backupCount=5)
-file_handler.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s [%(levelname)s]: %(message)s")
+# Shared with every main.py worker; logrotate rotates it (partyprint.logrotate), we just reopen.
+file_handler = WatchedFileHandler(log_path)
+file_handler.setLevel(LOG_LEVEL)
+file_handler.addFilter(RepeatFilter())
+formatter = logging.Formatter("%(created).3f %(levelname)s %(message)s")  # same lines as main.py, no strftime
 file_handler.setFormatter(formatter)
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
+
+# Buffer records and write them in bursts (see logutils.start_log_flusher).
+log_buffer = MemoryHandler(capacity=512, flushLevel=logging.ERROR, target=file_handler, flushOnClose=True)
+log_buffer.setLevel(LOG_LEVEL)
+start_log_flusher(log_buffer)
+
+# Request threads only enqueue records; the listener thread does the file I/O.
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, log_buffer, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+app.logger.addHandler(QueueHandler(log_queue))
+app.logger.setLevel(LOG_LEVEL)
 app.logger.info("PartyPrint Admin Started")
 
 LOG_PATH = log_path
+SSE_KEEPALIVE_MS = 15000
 
 # ------------------------------------------------------------------
 # Email (optional, ready for password reset expansion)
@@ -65,6 +113,12 @@ app.config["MAIL_USE_SSL"] = False
 
 mail = Mail(app)
 
+# ------------------------------------------------------------------
+# AWS (S3 photo storage)
+# ------------------------------------------------------------------
+S3_CLIENT = boto3.client("s3", region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+S3_BUCKET = os.getenv("S3_BUCKET")
+
 # ------------------------------------------------------------------
 # Models
 # ------------------------------------------------------------------
@@ -75,6 +129,31 @@ class AdminUser(UserMixin, db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+# ------------------------------------------------------------------
+# Password hashing
+# ------------------------------------------------------------------
+# argon2id; cost is env-tunable so it can be raised as hardware improves. Existing
+# werkzeug (scrypt/pbkdf2) hashes still verify and are upgraded on the next login.
+PH = PasswordHasher(
+    time_cost=int(os.getenv("ARGON2_TIME_COST", 2)),
+    memory_cost=int(os.getenv("ARGON2_MEMORY_KIB", 64 * 1024)),
+    parallelism=int(os.getenv("ARGON2_PARALLELISM", 1)),
+)
+
+def hash_password(password):
+    return PH.hash(password)
+
+def check_password(pw_hash, password):
+    if not pw_hash.startswith("$argon2"):
+        return check_password_hash(pw_hash, password)
+    try:
+        return PH.verify(pw_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def needs_rehash(pw_hash):
+    return not pw_hash.startswith("$argon2") or PH.check_needs_rehash(pw_hash)
+
 # ------------------------------------------------------------------
 # Login manager
 # ------------------------------------------------------------------
@@ -82,111 +161,64 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "login"
 
+# Cache detached AdminUser rows so authenticated requests (and SSE reconnects)
+# don't hit the database on every hit.
+_user_cache = cachetools.TTLCache(maxsize=1024, ttl=60)
+_user_cache_lock = threading.Lock()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return AdminUser.query.get(int(user_id))
+    user_id = int(user_id)
+    with _user_cache_lock:
+        user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = db.session.get(AdminUser, user_id)
+    if user is not None:
+        make_transient(user)
+        with _user_cache_lock:
+            _user_cache[user_id] = user
+    return user
+
+def forget_user(user_id):
+    """Drop a cached user (call on logout / password change)."""
+    with _user_cache_lock:
+        _user_cache.pop(int(user_id), None)
 
 # ------------------------------------------------------------------
 # Routes: Register / Login / Logout
 # ------------------------------------------------------------------
-@app.route("/register", methods=["GET", "POST"])
-def register():
-    if request.method == "POST":
-        email = request.form["email"].strip()
-        password = request.form["password"]
-        if AdminUser.query.filter_by(email=email).first():
-            flash("👻 That email is already registered — the spirits remember you.")
-            return redirect(url_for("register"))
-        hashed = generate_password_hash(password)
-        new_user = AdminUser(email=email, password_hash=hashed)
-        db.session.add(new_user)
-        db.session.commit()
-        app.logger.info(f"New admin registered: {email}")
-        flash("🎃 You’re in! The portal awaits. Please log in below.")
-        return redirect(url_for("login"))
-
-    return render_template_string("""
+# Shared stylesheet for the register/login pages. The URL carries a content hash,
+# so browsers can keep versioned static files for a year and still pick up edits
+# on the next deploy; unversioned ones keep Flask's revalidate-every-time default.
+def _static_max_age(filename):
+    return 365 * 24 * 3600 if request.args.get("v") else None
+
+app.get_send_file_max_age = _static_max_age
+with open(os.path.join(app.static_folder, "admin.css"), "rb") as f:
+    ADMIN_CSS_URL = "/static/admin.css?v=" + hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
+def _static_page(prefix, suffix, etag):
+    """Serve a prebuilt page, splicing in any flashed messages at its <!--FLASH--> marker."""
+    msgs = get_flashed_messages()
+    if msgs:
+        flashes = "".join(f"<div class=flash>{html.escape(m)}</div>" for m in msgs).encode()
+        return Response(prefix + flashes + suffix, mimetype="text/html")
+    resp = Response(prefix + suffix, mimetype="text/html")
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+REGISTER_HTML = f"""
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
         <title>PartyPrint Admin – Registration</title>
-        <style>
-            body {
-                background: radial-gradient(circle at center, #0a0a0a 0%, #000 100%);
-                color: #ff6600;
-                font-family: 'Courier New', monospace;
-                text-align: center;
-                padding-top: 5rem;
-                overflow: hidden;
-            }
-            h2 {
-                font-size: 2rem;
-                text-shadow: 0 0 10px #ff6600, 0 0 20px #ff3300;
-                animation: flicker 2s infinite alternate;
-            }
-            @keyframes flicker {
-                from { opacity: 1; }
-                to { opacity: 0.7; }
-            }
-            form {
-                display: inline-block;
-                background: rgba(255, 102, 0, 0.05);
-                border: 1px solid #ff6600;
-                border-radius: 8px;
-                padding: 2rem;
-                margin-top: 1rem;
-                box-shadow: 0 0 15px #ff3300;
-            }
-            input {
-                display: block;
-                margin: 1rem auto;
-                padding: 0.5rem;
-                width: 250px;
-                border: 1px solid #ff6600;
-                border-radius: 4px;
-                background: #111;
-                color: #ffcc66;
-                text-align: center;
-            }
-            button {
-                background: #ff6600;
-                color: #000;
-                border: none;
-                padding: 0.75rem 2rem;
-                border-radius: 4px;
-                font-weight: bold;
-                cursor: pointer;
-                transition: background 0.3s;
-            }
-            button:hover {
-                background: #ffaa00;
-                color: #111;
-                box-shadow: 0 0 15px #ff6600;
-            }
-            a {
-                color: #ff9933;
-                text-decoration: none;
-            }
-            a:hover {
-                text-decoration: underline;
-            }
-            .pumpkin {
-                position: absolute;
-                bottom: -60px;
-                left: 50%;
-                transform: translateX(-50%);
-                font-size: 100px;
-                animation: float 4s ease-in-out infinite;
-            }
-            @keyframes float {
-                0%, 100% { transform: translate(-50%, 0); }
-                50% { transform: translate(-50%, -10px); }
-            }
-        </style>
+        <link rel="stylesheet" href="{ADMIN_CSS_URL}">
     </head>
     <body>
         <h2>🎃 PartyPrint Admin Registration 🎃</h2>
+        <!--FLASH-->
         <form method="POST">
             <input name="email" placeholder="Email (for spooky invites)">
             <input name="password" type="password" placeholder="Secret incantation">
@@ -196,104 +228,41 @@ def register():
         <div class="pumpkin">🎃</div>
     </body>
     </html>
-    """)
-
+    """
+_REGISTER_PREFIX, _REGISTER_SUFFIX = (part.encode() for part in REGISTER_HTML.split("<!--FLASH-->"))
+_REGISTER_ETAG = hashlib.blake2b(_REGISTER_PREFIX + _REGISTER_SUFFIX, digest_size=16).hexdigest()
 
-@app.route("/login", methods=["GET", "POST"])
-def login():
+@app.route("/register", methods=["GET", "POST"])
+def register():
     if request.method == "POST":
         email = request.form["email"].strip()
         password = request.form["password"]
-        user = AdminUser.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
-            login_user(user)
-            app.logger.info(f"Admin logged in: {email}")
-            return redirect(url_for("dashboard"))
-        flash("💀 Invalid incantation — the portal remains closed.")
+        if db.session.execute(select(1).where(AdminUser.email == email)).scalar():
+            flash("👻 That email is already registered — the spirits remember you.")
+            return redirect(_REGISTER_URL, 303)
+        hashed = hash_password(password)
+        new_user = AdminUser(email=email, password_hash=hashed)
+        db.session.add(new_user)
+        db.session.commit()
+        app.logger.info("New admin registered: %s", email)
+        flash("🎃 You’re in! The portal awaits. Please log in below.")
+        return redirect(_LOGIN_URL, 303)
+
+    return _static_page(_REGISTER_PREFIX, _REGISTER_SUFFIX, _REGISTER_ETAG)
+
 
-    return render_template_string("""
+LOGIN_HTML = f"""
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
         <title>PartyPrint Admin – Login</title>
-        <style>
-            body {
-                background: radial-gradient(circle at center, #0a0a0a 0%, #000 100%);
-                color: #ff6600;
-                font-family: 'Courier New', monospace;
-                text-align: center;
-                padding-top: 5rem;
-                overflow: hidden;
-            }
-            h2 {
-                font-size: 2rem;
-                text-shadow: 0 0 10px #ff6600, 0 0 20px #ff3300;
-                animation: flicker 2s infinite alternate;
-            }
-            @keyframes flicker {
-                from { opacity: 1; }
-                to { opacity: 0.7; }
-            }
-            form {
-                display: inline-block;
-                background: rgba(255, 102, 0, 0.05);
-                border: 1px solid #ff6600;
-                border-radius: 8px;
-                padding: 2rem;
-                margin-top: 1rem;
-                box-shadow: 0 0 15px #ff3300;
-            }
-            input {
-                display: block;
-                margin: 1rem auto;
-                padding: 0.5rem;
-                width: 250px;
-                border: 1px solid #ff6600;
-                border-radius: 4px;
-                background: #111;
-                color: #ffcc66;
-                text-align: center;
-            }
-            button {
-                background: #ff6600;
-                color: #000;
-                border: none;
-                padding: 0.75rem 2rem;
-                border-radius: 4px;
-                font-weight: bold;
-                cursor: pointer;
-                transition: background 0.3s;
-            }
-            button:hover {
-                background: #ffaa00;
-                color: #111;
-                box-shadow: 0 0 15px #ff6600;
-            }
-            a {
-                color: #ff9933;
-                text-decoration: none;
-            }
-            a:hover {
-                text-decoration: underline;
-            }
-            .bat {
-                position: absolute;
-                top: 20px;
-                left: -60px;
-                font-size: 60px;
-                animation: fly 10s linear infinite;
-            }
-            @keyframes fly {
-                0% { left: -60px; transform: rotate(0deg); }
-                50% { left: 50%; transform: rotate(10deg); }
-                100% { left: 110%; transform: rotate(0deg); }
-            }
-        </style>
+        <link rel="stylesheet" href="{ADMIN_CSS_URL}">
     </head>
     <body>
         <div class="bat">🦇</div>
         <h2>🕸️ PartyPrint Admin Login 🕸️</h2>
+        <!--FLASH-->
         <form method="POST">
             <input name="email" placeholder="Email of the Initiate">
             <input name="password" type="password" placeholder="Secret Spell">
@@ -302,52 +271,105 @@ def login():
         <p><a href="/register">New spirit? Register here</a></p>
     </body>
     </html>
-    """)
+    """
+_LOGIN_PREFIX, _LOGIN_SUFFIX = (part.encode() for part in LOGIN_HTML.split("<!--FLASH-->"))
+_LOGIN_ETAG = hashlib.blake2b(_LOGIN_PREFIX + _LOGIN_SUFFIX, digest_size=16).hexdigest()
+
+# Verified against when the email is unknown, so every login attempt pays the
+# same hashing cost and response time doesn't reveal registered emails.
+DUMMY_HASH = hash_password("x" * 16)
+
+# Recent *successful* verifications, keyed by a per-process keyed hash of (stored hash,
+# password). A password change changes the stored hash, so stale entries can never
+# match. Failures are never cached: a fast "no" would let a warmed entry tell a
+# registered email apart from an unknown one.
+_verify_cache = cachetools.TTLCache(maxsize=4096, ttl=60)
+_verify_cache_lock = threading.Lock()
+_VERIFY_CACHE_KEY = os.urandom(32)
+
+def verify_password(pw_hash, password):
+    key = hashlib.blake2b(
+        f"{pw_hash}|{password}".encode(), digest_size=16, key=_VERIFY_CACHE_KEY
+    ).digest()
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            return True
+    ok = check_password(pw_hash, password)
+    if ok:
+        with _verify_cache_lock:
+            _verify_cache[key] = True
+    return ok
+
+@app.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        email = request.form["email"].strip()
+        password = request.form["password"]
+        # Two columns only -- no ORM hydration; load_user() builds (and caches) the object.
+        row = db.session.execute(
+            select(AdminUser.id, AdminUser.password_hash).where(AdminUser.email == email)
+        ).first()
+        # Unknown emails verify against DUMMY_HASH directly, never through the cache,
+        # so no password makes them cheaper than a registered email's failed attempt.
+        ok = verify_password(row.password_hash, password) if row else check_password(DUMMY_HASH, password)
+        # Both hash paths (real or dummy) have already run by here, so this check
+        # doesn't change the timing.
+        if row and ok:
+            if needs_rehash(row.password_hash):
+                db.session.execute(
+                    update(AdminUser).where(AdminUser.id == row.id).values(password_hash=hash_password(password))
+                )
+                db.session.commit()
+                forget_user(row.id)
+            login_user(load_user(row.id))
+            app.logger.info("Admin logged in: %s", email)
+            return redirect(_DASHBOARD_URL, 303)
+        flash("💀 Invalid incantation — the portal remains closed.")
+
+    return _static_page(_LOGIN_PREFIX, _LOGIN_SUFFIX, _LOGIN_ETAG)
 
 
 @app.route("/logout")
 @login_required
 def logout():
-    app.logger.info(f"Admin logged out: {current_user.email}")
+    app.logger.info("Admin logged out: %s", current_user.email)
+    forget_user(current_user.id)
     logout_user()
-    return redirect(url_for("login"))
+    return redirect(_LOGIN_URL, 303)
 
 # ------------------------------------------------------------------
 # Dashboard (protected)
 # ------------------------------------------------------------------
-@app.route("/dashboard")
-@login_required
-def dashboard():
-    html = f"""
+DASHBOARD_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
         <title>PartyPrint Admin Dashboard</title>
         <style>
-            body {{
+            body {
                 background:#0b0b0b;
                 color:#0f0;
                 font-family:monospace;
                 padding:1rem;
                 overflow:hidden;
-            }}
-            h2 {{
+            }
+            h2 {
                 color:#ff6600;
                 text-shadow:0 0 10px #ff6600;
-            }}
-            #links {{
+            }
+            #links {
                 margin-bottom: 1rem;
-            }}
-            a {{
+            }
+            a {
                 color:#ff9933;
                 margin-right: 1rem;
                 text-decoration:none;
                 font-weight:bold;
-            }}
-            a:hover {{
+            }
+            a:hover {
                 text-decoration:underline;
-            }}
-            #log {{
+            }
+            #log {
                 background:#000;
                 border:1px solid #222;
                 padding:1rem;
@@ -355,11 +377,11 @@ def dashboard():
                 overflow-y:scroll;
                 white-space:pre-wrap;
                 line-height:1.3;
-            }}
-            #controls {{
+            }
+            #controls {
                 margin-top:0.5rem;
-            }}
-            button {{
+            }
+            button {
                 background:#ff6600;
                 border:none;
                 padding:0.5rem 1rem;
@@ -367,14 +389,14 @@ def dashboard():
                 font-weight:bold;
                 border-radius:4px;
                 cursor:pointer;
-            }}
-            button:hover {{
+            }
+            button:hover {
                 background:#ffaa00;
-            }}
+            }
         </style>
     </head>
     <body>
-        <h2>🎃 Welcome, {current_user.email}</h2>
+        <h2>🎃 Welcome, <!--EMAIL--></h2>
         <div id="links">
             <a href='/jobs'>🖨️ View Print Jobs</a>
             <a href='/logout'>🚪 Logout</a>
@@ -390,82 +412,179 @@ def dashboard():
           let autoScroll = true;
 
           // Detect manual scroll
-          logEl.addEventListener("scroll", () => {{
+          logEl.addEventListener("scroll", () => {
               const nearBottom = logEl.scrollTop + logEl.clientHeight >= logEl.scrollHeight - 20;
-              if (!nearBottom) {{
+              if (!nearBottom) {
                   autoScroll = false;
                   jumpBtn.style.display = "inline-block";
-              }} else {{
+              } else {
                   autoScroll = true;
                   jumpBtn.style.display = "none";
-              }}
-          }});
+              }
+          });
 
-          jumpBtn.addEventListener("click", () => {{
+          jumpBtn.addEventListener("click", () => {
               logEl.scrollTop = logEl.scrollHeight;
               autoScroll = true;
               jumpBtn.style.display = "none";
-          }});
+          });
 
           // Stream logs via SSE
           const evt = new EventSource("/stream_logs");
-          evt.onmessage = e => {{
+          evt.onmessage = e => {
               logEl.textContent += e.data + "\\n";
-              if (autoScroll) {{
+              if (autoScroll) {
                   logEl.scrollTop = logEl.scrollHeight;
-              }}
-          }};
+              }
+          };
         </script>
     </body>
     </html>
     """
-    return render_template_string(html)
+_DASHBOARD_PREFIX, _DASHBOARD_SUFFIX = (part.encode() for part in DASHBOARD_HTML.split("<!--EMAIL-->"))
+
+@app.route("/dashboard")
+@login_required
+def dashboard():
+    body = _DASHBOARD_PREFIX + html.escape(current_user.email).encode() + _DASHBOARD_SUFFIX
+    return Response(body, mimetype="text/html")
 
 
 
 # ------------------------------------------------------------------
 # Live log stream (SSE)
 # ------------------------------------------------------------------
+def _gzip_stream(frames):
+    """Gzip a stream of SSE frames, sync-flushing after each so events aren't held back."""
+    co = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for frame in frames:
+            yield co.compress(frame) + co.flush(zlib.Z_SYNC_FLUSH)
+    finally:
+        frames.close()
+
+class LogTailer:
+    """Follows a log file on one background thread and fans new line batches out to every SSE client."""
+
+    def __init__(self, path, backlog=256):
+        self.path = path
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._batches = deque(maxlen=backlog)  # (seq, lines)
+        self._thread = None
+
+    def follow(self):
+        """Yield SSE frames for lines logged from now on, with a keepalive comment when idle."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-tailer", daemon=True)
+                self._thread.start()
+            seen = self._seq
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq > seen, timeout=SSE_KEEPALIVE_MS / 1000)
+                fresh = [lines for seq, lines in self._batches if seq > seen]
+                seen = self._seq
+            yield sse_event(b"\n".join(fresh)) if fresh else b": keepalive\n\n"
+
+    def _publish(self, lines):
+        with self._cond:
+            self._seq += 1
+            self._batches.append((self._seq, lines))
+            self._cond.notify_all()
+
+    def _run(self):
+        try:
+            self._tail()
+        except Exception:
+            app.logger.exception("Log tailer stopped")
+            with self._cond:
+                self._thread = None
+
+    def _tail(self):
+        ino = INotify()
+        fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        os.lseek(fd, 0, os.SEEK_END)
+        wd = ino.add_watch(self.path, LOG_WATCH_FLAGS)
+        buf = b""
+        while True:
+            buf += read_available(fd)
+            if b"\n" in buf:
+                lines, buf = buf.rsplit(b"\n", 1)
+                self._publish(lines)
+            # Block in the kernel until the log changes.
+            events = ino.read()
+            # Debounce: let a burst of writes land so it goes out as one event.
+            time.sleep(SSE_DEBOUNCE_S)
+            events += ino.read(timeout=0)
+            if any(e.mask & flags.MOVE_SELF for e in events):
+                # Rotated: flush what's left of the old file, then follow the new one.
+                buf += read_available(fd)
+                if buf:
+                    self._publish(buf.rstrip(b"\n"))
+                    buf = b""
+                os.close(fd)
+                ino.rm_watch(wd)
+                while not os.path.exists(self.path):
+                    time.sleep(0.1)
+                fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+                wd = ino.add_watch(self.path, LOG_WATCH_FLAGS)
+
+log_tailer = LogTailer(LOG_PATH)
+
 @app.route("/stream_logs")
 @login_required
 def stream_logs():
-    def generate():
-        if not os.path.exists(LOG_PATH):
-            yield "data: (No log file found)\n\n"
-            return
-        with open(LOG_PATH, "r") as f:
-            f.seek(0, os.SEEK_END)
-            while True:
-                line = f.readline()
-                if line:
-                    yield f"data: {line.strip()}\n\n"
-                time.sleep(0.5)
-    return Response(generate(), mimetype="text/event-stream")
-
-
-import sqlite3
+    if not os.path.exists(LOG_PATH):
+        return Response(b"data: (No log file found)\n\n", mimetype="text/event-stream")
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if "gzip" not in request.accept_encodings:
+        return Response(log_tailer.follow(), mimetype="text/event-stream", headers=headers)
+    headers["Content-Encoding"] = "gzip"
+    return Response(_gzip_stream(log_tailer.follow()), mimetype="text/event-stream", headers=headers)
+
 
 DB_PATH = "/home/ubuntu/partyprint-demo/jobs.db"
+JOBS_PER_PAGE = 50
+JOBS_PAGE_CAP = 200
+SQL_ACTIVE_JOBS = (
+    "SELECT id, user, url, status, created_at FROM jobs WHERE status != 'printed' "
+    "ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+)
+SQL_ALL_JOBS = "SELECT id, user, url, status, created_at FROM jobs ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+# Hot statements kept as constants: sqlite3 caches prepared statements per connection by SQL text.
+SQL_QUEUE_JOB = "UPDATE jobs SET status = 'queued' WHERE id = ?"
+SQL_MARK_PRINTED = "UPDATE jobs SET status = 'printed' WHERE id = ?"
+SQL_JOB_FILENAME = "SELECT filename FROM jobs WHERE id = ?"
+SQL_DELETE_JOB = "DELETE FROM jobs WHERE id = ?"
+OPTIMIZE_EVERY = 1000
+BULK_DELETE_BATCH = 500  # under both S3's 1000-key and SQLite's bound-parameter limits
+
+def _conn():
+    return thread_conn(DB_PATH)
+
+_query_count = itertools.count(1)
 
 def db_query(query, params=(), fetch=False):
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute(query, params)
-        if fetch:
-            return cur.fetchall()
-        conn.commit()
+    conn = _conn()
+    cur = conn.execute(query, params)
+    rows = cur.fetchall() if fetch else None
+    # Let SQLite refresh planner stats now and then as the jobs table grows.
+    if next(_query_count) % OPTIMIZE_EVERY == 0:
+        conn.execute("PRAGMA optimize")
+    return rows
+
+def init_db():
+    db_query("CREATE INDEX IF NOT EXISTS ix_jobs_created ON jobs(created_at DESC, id DESC)")
+    # Partial index covering only the active queue, so the default /jobs view stays a short range scan.
+    db_query("CREATE INDEX IF NOT EXISTS ix_jobs_active ON jobs(created_at DESC, id DESC) WHERE status != 'printed'")
+    db_query("ANALYZE")
 
 # ------------------------------------------------------------------
 # Photo Job Management
 # ------------------------------------------------------------------
-@app.route("/jobs")
-@login_required
-def jobs():
-    """List uploaded photos and allow print/delete actions."""
-    rows = db_query("SELECT id, filename, user, url, status, created_at FROM jobs ORDER BY created_at DESC", fetch=True)
-    jobs = [dict(zip(["id", "filename", "user", "url", "status", "created_at"], r)) for r in rows]
-
-    html = """
+JOBS_TMPL = app.jinja_env.from_string("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -482,15 +601,25 @@ def jobs():
         .print { background:orange; color:black; }
         .mark { background:limegreen; color:black; }
         .delete { background:crimson; color:white; }
+        .flash { color:#ff9933; text-align:center; }
       </style>
     </head>
     <body>
       <h2>🎃 Print Queue Management</h2>
+      {% for m in flashes %}<p class="flash">{{m}}</p>{% endfor %}
+      <p style="text-align:center;">
+        {% if show_all %}<a href="/jobs" style="color:#ff9933;">Show active only</a>
+        {% else %}<a href="/jobs?all=1" style="color:#ff9933;">Show all (incl. printed)</a>{% endif %}
+      </p>
+      <form id="bulk" action="/bulk_delete" method="POST"></form>
       <table>
-        <thead><tr><th>Preview</th><th>User</th><th>Status</th><th>Created</th><th>Actions</th></tr></thead>
+        <thead><tr><th></th><th>Preview</th><th>User</th><th>Status</th><th>Created</th><th>Actions</th></tr></thead>
         <tbody>
+        {% set ns = namespace(rows=0) %}
         {% for j in jobs %}
+          {% set ns.rows = loop.index %}
           <tr>
+            <td><input type="checkbox" name="ids" value="{{j.id}}" form="bulk"></td>
             <td><img src="{{j.url}}" alt="preview"></td>
             <td>{{j.user}}</td>
             <td>{{j.status}}</td>
@@ -510,51 +639,96 @@ def jobs():
         {% endfor %}
         </tbody>
       </table>
+      <p><button class="delete" form="bulk">❌ Delete Selected</button></p>
+      <p style="text-align:center;margin-top:1rem;">
+        {% if page > 1 %}<a href="/jobs?page={{page - 1}}&per_page={{per_page}}{% if show_all %}&all=1{% endif %}" style="color:#ff9933;">← Newer</a>{% endif %}
+        {% if ns.rows == per_page %}<a href="/jobs?page={{page + 1}}&per_page={{per_page}}{% if show_all %}&all=1{% endif %}" style="color:#ff9933;">Older →</a>{% endif %}
+      </p>
       <p style="text-align:center;margin-top:1rem;"><a href="/dashboard" style="color:#ff9933;">← Back to Logs</a></p>
     </body>
     </html>
-    """
-    return render_template_string(html, jobs=jobs)
+    """)
+
+@app.route("/jobs")
+@login_required
+def jobs():
+    """List uploaded photos and allow print/delete actions."""
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", JOBS_PER_PAGE, type=int), 1), JOBS_PAGE_CAP)
+    show_all = request.args.get("all") == "1"
+    # Render straight off the cursor so the first rows ship before the rest are fetched.
+    cur = _conn().execute(SQL_ALL_JOBS if show_all else SQL_ACTIVE_JOBS, (per_page, (page - 1) * per_page))
+    # Pop flashes here, not in the template: the session is saved before a streamed body renders.
+    flashes = get_flashed_messages()
+    stream = JOBS_TMPL.stream(jobs=cur, page=page, per_page=per_page, show_all=show_all, flashes=flashes)
+    stream.enable_buffering(20)
+    return Response(stream_with_context(stream), mimetype="text/html")
 
 @app.post("/queue_job/<job_id>")
 @login_required
 def queue_job(job_id):
-    db_query("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
-    app.logger.info(f"[ADMIN] Queued job {job_id} for print.")
+    db_query(SQL_QUEUE_JOB, (job_id,))
+    app.logger.info("[ADMIN] Queued job %s for print.", job_id)
     flash("🖨️ Queued for print.")
-    return redirect(url_for("jobs"))
+    return redirect(_JOBS_URL, 303)
 
 @app.post("/mark_printed/<job_id>")
 @login_required
 def mark_printed(job_id):
-    db_query("UPDATE jobs SET status = 'printed' WHERE id = ?", (job_id,))
-    app.logger.info(f"[ADMIN] Marked job {job_id} as printed.")
+    db_query(SQL_MARK_PRINTED, (job_id,))
+    app.logger.info("[ADMIN] Marked job %s as printed.", job_id)
     flash("✅ Marked as printed.")
-    return redirect(url_for("jobs"))
+    return redirect(_JOBS_URL, 303)
 
 @app.post("/delete_job/<job_id>")
 @login_required
 def delete_job(job_id):
-    from botocore.exceptions import ClientError
-    import boto3
-    s3 = boto3.client("s3", region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
-    bucket = os.getenv("S3_BUCKET")
-
-    row = db_query("SELECT filename FROM jobs WHERE id = ?", (job_id,), fetch=True)
+    row = db_query(SQL_JOB_FILENAME, (job_id,), fetch=True)
     if row:
         filename = row[0][0]
         try:
-            s3.delete_object(Bucket=bucket, Key=filename)
-            app.logger.info(f"[ADMIN] Deleted {filename} from S3.")
+            S3_CLIENT.delete_object(Bucket=S3_BUCKET, Key=filename)
+            app.logger.info("[ADMIN] Deleted %s from S3.", filename)
         except ClientError as e:
-            app.logger.warning(f"[ADMIN] Failed to delete {filename}: {e}")
+            app.logger.warning("[ADMIN] Failed to delete %s: %s", filename, e)
 
-    db_query("DELETE FROM jobs WHERE id = ?", (job_id,))
-    app.logger.info(f"[ADMIN] Deleted job {job_id} from DB.")
+    db_query(SQL_DELETE_JOB, (job_id,))
+    app.logger.info("[ADMIN] Deleted job %s from DB.", job_id)
     flash("❌ Deleted photo.")
-    return redirect(url_for("jobs"))
-
+    return redirect(_JOBS_URL, 303)
 
+@app.post("/bulk_delete")
+@login_required
+def bulk_delete():
+    """Delete many jobs with one S3 DeleteObjects call and one SQL DELETE per batch."""
+    ids = request.form.getlist("ids")
+    for i in range(0, len(ids), BULK_DELETE_BATCH):
+        batch = ids[i:i + BULK_DELETE_BATCH]
+        marks = ",".join("?" * len(batch))
+        rows = db_query(f"SELECT id, filename FROM jobs WHERE id IN ({marks})", batch, fetch=True)
+        if rows:
+            try:
+                resp = S3_CLIENT.delete_objects(
+                    Bucket=S3_BUCKET,
+                    Delete={"Objects": [{"Key": r["filename"]} for r in rows], "Quiet": True},
+                )
+                for err in resp.get("Errors", []):
+                    app.logger.warning("[ADMIN] Failed to delete %s: %s", err['Key'], err.get('Message'))
+                app.logger.info("[ADMIN] Bulk deleted %d photos from S3.", len(rows))
+            except ClientError as e:
+                app.logger.warning("[ADMIN] Bulk S3 delete failed: %s", e)
+        db_query(f"DELETE FROM jobs WHERE id IN ({marks})", batch)
+    app.logger.info("[ADMIN] Bulk deleted %d jobs from DB.", len(ids))
+    flash(f"❌ Deleted {len(ids)} photos.")
+    return redirect(_JOBS_URL, 303)
+
+
+# Redirect targets resolved once instead of walking the URL map per request.
+with app.test_request_context():
+    _REGISTER_URL = url_for("register")
+    _LOGIN_URL = url_for("login")
+    _DASHBOARD_URL = url_for("dashboard")
+    _JOBS_URL = url_for("jobs")
 
 # ------------------------------------------------------------------
 # Main
@@ -562,4 +736,5 @@ def delete_job(job_id):
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+    init_db()
     app.run(host="0.0.0.0", port=5051, debug=False)
@@ -0,0 +1,22 @@
+"""SQLite helper shared by main.py and admin.py (both work on jobs.db)."""
+import sqlite3, threading
+
+# One autocommit connection per thread (and database file), opened lazily and reused.
+_tls = threading.local()
+
+def thread_conn(path):
+    """Return this thread's connection to `path`: WAL, synchronous=NORMAL, sqlite3.Row rows."""
+    conns = getattr(_tls, "conns", None)
+    if conns is None:
+        conns = _tls.conns = {}
+    c = conns.get(path)
+    if c is None:
+        c = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute("PRAGMA busy_timeout=5000")  # wait out the other app's writes instead of failing
+        c.execute("PRAGMA cache_size=-8000")  # 8 MiB page cache
+        c.execute("PRAGMA temp_store=MEMORY")
+        c.row_factory = sqlite3.Row
+        conns[path] = c
+    return c
@@ -0,0 +1,15 @@
+# gunicorn -c gunicorn.conf.py main:app
+# Workers never rotate partyprint.log themselves: install partyprint.logrotate on
+# the host (see that file).
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5050")
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() * 2 + 1))
+worker_class = "uvicorn_worker.UvicornWorker"  # the uvicorn-worker package; uvicorn.workers is deprecated
+keepalive = 30
+
+# Import main.py once in the master (DB init, index/template setup) and fork the
+# workers from it. Per-process resources (log threads, async S3 client, SQLite
+# connections) are created after the fork, in each worker; main.py drains its
+# log queue around each fork itself.
+preload_app = True
@@ -0,0 +1,59 @@
+"""Logging helpers shared by main.py and admin.py (both write and tail partyprint.log)."""
+import os, logging, threading, time
+import cachetools
+from inotify_simple import flags
+
+LOG_WATCH_FLAGS = flags.MODIFY | flags.MOVE_SELF
+SSE_DEBOUNCE_S = 0.05
+LOG_FLUSH_INTERVAL = 0.5
+
+class RepeatFilter(logging.Filter):
+    """Drop a record identical to one written in the last `window` seconds.
+
+    The log file is tailed live by both dashboards; this keeps a message repeated
+    in a tight loop from flooding them. With `logger_name` set, only that logger's
+    (and its children's) records are deduplicated -- e.g. so identical access-log
+    lines from a kiosk polling /gallery still all get written.
+    """
+    def __init__(self, window=5.0, maxsize=1024, logger_name=None):
+        super().__init__()
+        self._recent = cachetools.TTLCache(maxsize=maxsize, ttl=window)
+        self._scope = logging.Filter(logger_name) if logger_name else None
+
+    def filter(self, record):
+        if self._scope is not None and not self._scope.filter(record):
+            return True
+        key = (record.levelno, record.getMessage())
+        if key in self._recent:
+            return False
+        self._recent[key] = True
+        return True
+
+def start_log_flusher(handler, interval=LOG_FLUSH_INTERVAL):
+    """Flush a buffering handler every `interval` seconds on a daemon thread.
+
+    Records are buffered and written in bursts (errors flush at once); this bounds
+    how stale the tailed log, and so the live log views, can get.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            handler.flush()
+    threading.Thread(target=run, name="log-flusher", daemon=True).start()
+
+def read_available(fd):
+    """Read everything currently in the file past the fd's offset, 64 KiB at a time."""
+    chunks = []
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            break
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def sse_event(lines):
+    """Pack newline-separated log lines into a single multi-line SSE event."""
+    return b"data: " + lines.replace(b"\n", b"\ndata: ") + b"\n\n"
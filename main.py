@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
-import os, io, uuid, sqlite3, boto3, logging, traceback, time
+import os, uuid, hashlib, sqlite3, aioboto3, logging, asyncio, time, queue, atexit
+import orjson, redis
+from aiobotocore.config import AioConfig
+from contextlib import AsyncExitStack
 from dotenv import load_dotenv
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-from logging.handlers import RotatingFileHandler
-from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from logging.handlers import WatchedFileHandler, MemoryHandler, QueueHandler, QueueListener
+from fastapi import FastAPI, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.wsgi import WSGIMiddleware
-from flask import Flask, Response
+from inotify_simple import INotify, flags
+from logutils import RepeatFilter, start_log_flusher, read_available, sse_event, LOG_WATCH_FLAGS, SSE_DEBOUNCE_S
+from dbutils import thread_conn
 from pathlib import Path
 
 # -------------------------------------------------------------------
@@ -24,21 +29,68 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # -------------------------------------------------------------------
 # Logging setup
 # -------------------------------------------------------------------
+class PersistentMemoryHandler(MemoryHandler):
+    """MemoryHandler that keeps its target when closed.
+
+    uvicorn applies its logging dictConfig after this module is imported, which
+    closes every existing handler; a stock MemoryHandler would drop its target
+    and then buffer records forever.
+    """
+    def close(self):
+        self.flush()
+        logging.Handler.close(self)
+
 logger = logging.getLogger("partyprint")
-logger.setLevel(logging.INFO)
-fh = RotatingFileHandler(LOG_PATH, maxBytes=2_000_000, backupCount=5)
-fh.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
-logger.addHandler(fh)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+# Epoch seconds rather than asctime: %(created) is already on the record, while
+# asctime costs a localtime() + strftime() per line.
+LOG_FORMAT = logging.Formatter("%(created).3f %(levelname)s %(message)s")
+# Every gunicorn/uvicorn worker and admin.py append to this one file, so none of them
+# may rotate it (each would rename it on its own schedule). logrotate does, with
+# partyprint.logrotate (rename + create, no copytruncate): install it on the host.
+# WatchedFileHandler reopens the new file on the next write; the tailers follow it.
+fh = WatchedFileHandler(LOG_PATH)
+fh.addFilter(RepeatFilter(logger_name="partyprint"))  # app records only; every access line is kept
+fh.setFormatter(LOG_FORMAT)
+# Buffer file records and write them in bursts (see logutils.start_log_flusher).
+log_buffer = PersistentMemoryHandler(capacity=512, flushLevel=logging.ERROR, target=fh)
 ch = logging.StreamHandler()
-ch.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
-logger.addHandler(ch)
-logger.info("=== PartyPrint server starting ===")
+ch.setFormatter(LOG_FORMAT)
+ch.addFilter(logging.Filter("partyprint"))  # uvicorn already prints its access lines to the console
+
+# Request paths only enqueue records; a listener thread does the formatting and I/O.
+log_queue = queue.SimpleQueue()
+log_queue_handler = QueueHandler(log_queue)
+logger.addHandler(log_queue_handler)
+log_listener = None
+
+def start_log_listener():
+    global log_listener
+    log_listener = QueueListener(log_queue, log_buffer, ch, respect_handler_level=True)
+    log_listener.start()
+
+def stop_log_listener():
+    log_listener.stop()  # returns once everything queued so far has been handled
+    log_buffer.flush()
+
+start_log_listener()
+# Threads don't survive fork (gunicorn preload): drain in the parent first so nothing
+# queued there is written twice, then give each side its own listener.
+os.register_at_fork(before=stop_log_listener, after_in_parent=start_log_listener,
+                    after_in_child=start_log_listener)
+atexit.register(stop_log_listener)
+
+# Bound once and used for every log call below (skips the attribute lookup per call).
+_info, _warn, _err, _exc = logger.info, logger.warning, logger.error, logger.exception
+
+_info("=== PartyPrint server starting ===")
 
 # -------------------------------------------------------------------
 # Database setup (SQLite)
 # -------------------------------------------------------------------
 def init_db():
     with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")  # persistent: readers no longer block on writers
         conn.execute("""
             CREATE TABLE IF NOT EXISTS jobs (
                 id TEXT PRIMARY KEY,
@@ -49,56 +101,185 @@ def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-    logger.info("Database initialized: jobs.db")
+        # Lets /next-job find the oldest queued job with an index seek instead of a full sort.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+    _info("Database initialized: jobs.db")
 
 def db_query(query, params=(), fetch=False):
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.cursor()
-        cur.execute(query, params)
-        if fetch:
-            return cur.fetchall()
-        conn.commit()
+    cur = thread_conn(DB_PATH).execute(query, params)
+    if fetch:
+        return cur.fetchall()
 
 init_db()
 
+# -------------------------------------------------------------------
+# Redis response cache (gallery / job lists)
+# -------------------------------------------------------------------
+# The party UI polls these lists constantly; serve the serialized JSON from Redis
+# for a few seconds and drop it on every write. Redis being down only costs speed.
+CACHE_TTL = 3
+GALLERY_KEY = "gallery:v1"
+JOBS_KEY = "jobs:v1"
+rcache = redis.Redis(connection_pool=redis.BlockingConnectionPool(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    max_connections=32,
+    timeout=1,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+))
+
+def store_json(key, build):
+    """Build the JSON body for key, cache it, and return it."""
+    body = orjson.dumps(build())
+    try:
+        rcache.set(key, body, ex=CACHE_TTL)
+    except redis.RedisError as e:
+        _warn("[CACHE] set %s failed: %s", key, e)
+    return body
+
+def cached_json(request, key, build, max_age=0):
+    """Return the cached JSON body for key, building and storing it on a miss.
+
+    The body's hash doubles as a weak ETag so unchanged polls get an empty 304.
+    """
+    try:
+        body = rcache.get(key)
+    except redis.RedisError as e:
+        _warn("[CACHE] get %s failed: %s", key, e)
+        body = None
+    if body is None:
+        body = store_json(key, build)
+    etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"max-age={max_age}" if max_age else "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def invalidate_jobs_cache():
+    try:
+        rcache.delete(GALLERY_KEY, JOBS_KEY)
+    except redis.RedisError as e:
+        _warn("[CACHE] invalidate failed: %s", e)
+
 # -------------------------------------------------------------------
 # AWS setup
 # -------------------------------------------------------------------
 AWS_REGION = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
 BUCKET = os.getenv("S3_BUCKET")
-s3 = boto3.client("s3", region_name=AWS_REGION)
+# All S3 calls go through one aioboto3 client per process, opened at startup and
+# kept on app.state.s3 (see below), so no request blocks the event loop on S3.
+s3_session = aioboto3.Session()
+# Photo keys embed a fresh uuid and are never overwritten, so browsers may cache them for good.
+PHOTO_CACHE_CONTROL = "public, max-age=31536000"
+# 64 pooled keep-alive connections so bursts of uploads (8 parts each) don't queue
+# for a socket; adaptive retries back off client-side when S3 throttles.
+S3_CLIENT_CONFIG = AioConfig(
+    max_pool_connections=64,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=30,
+)
+# Photos above 5 MB go up as 8 MB multipart parts, up to 8 in flight at once;
+# smaller ones in a single PUT.
+S3_TRANSFER = TransferConfig(
+    multipart_threshold=5 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True,
+)
 
 # -------------------------------------------------------------------
 # FastAPI setup
 # -------------------------------------------------------------------
-app = FastAPI(title="PartyPrint Demo")
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson (FastAPI's own ORJSONResponse is deprecated upstream)."""
+    def render(self, content):
+        return orjson.dumps(content)
+
+app = FastAPI(title="PartyPrint Demo", default_response_class=OrjsonResponse)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+@app.on_event("startup")
+def run_log_flusher():
+    # Started per process (not at import) so it also runs in workers forked by gunicorn.
+    start_log_flusher(log_buffer)
+
+@app.on_event("startup")
+def route_access_log():
+    # uvicorn configures its own loggers after import, so hook in here: access lines
+    # then land in partyprint.log (and /admin/logs) alongside the app's records.
+    # The console keeps uvicorn's own copy only (see the filter on ch).
+    logging.getLogger("uvicorn.access").addHandler(log_queue_handler)
+
+@app.on_event("startup")
+async def open_s3():
+    app.state.s3_stack = AsyncExitStack()
+    app.state.s3 = await app.state.s3_stack.enter_async_context(
+        s3_session.client("s3", region_name=AWS_REGION, config=S3_CLIENT_CONFIG)
+    )
+
+@app.on_event("shutdown")
+async def close_s3():
+    await app.state.s3_stack.aclose()
+
 # -------------------------------------------------------------------
 # Middleware
 # -------------------------------------------------------------------
+SLOW_REQUEST_MS = 100
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"→ {request.method} {request.url.path}")
+    start = time.perf_counter_ns()
     try:
         response = await call_next(request)
-        logger.info(f"← {request.method} {request.url.path} [{response.status_code}]")
-        return response
-    except Exception as e:
-        logger.error(f"!! Error handling {request.url.path}: {e}")
-        logger.error(traceback.format_exc())
+    except Exception:
+        _exc("!! Error handling %s %s", request.method, request.url.path)
         return HTMLResponse("Internal Server Error", status_code=500)
+    # uvicorn's access log already records every request; only call out slow ones here.
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+    if elapsed_ms > SLOW_REQUEST_MS:
+        _warn("slow %s %s [%d] %.1fms", request.method, request.url.path,
+              response.status_code, elapsed_ms)
+    return response
 
 # -------------------------------------------------------------------
 # Routes
 # -------------------------------------------------------------------
 
+INDEX_FILE = STATIC_DIR / "index.html"
+_index_cache = (None, b"", "")  # (mtime_ns, body, etag); re-read only when the file changes
+
 @app.get("/", response_class=HTMLResponse)
-def index():
-    index_file = STATIC_DIR / "index.html"
-    if not index_file.exists():
+async def index(request: Request):
+    global _index_cache
+    try:
+        mtime = os.stat(INDEX_FILE).st_mtime_ns
+    except FileNotFoundError:
         return HTMLResponse("<h1>index.html not found</h1>", status_code=404)
-    return HTMLResponse(index_file.read_text())
+    if _index_cache[0] != mtime:
+        body = INDEX_FILE.read_bytes()
+        _index_cache = (mtime, body, '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest())
+    _, body, etag = _index_cache
+    headers = {"Cache-Control": "public, max-age=60", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+def record_upload(job_id, filename, user):
+    """Insert the job row for an object already in S3 and return the API response.
+
+    Blocking (SQLite + Redis): the async upload routes call it via asyncio.to_thread.
+    """
+    url = f"https://{BUCKET}.s3.amazonaws.com/{filename}"
+    db_query(
+        "INSERT OR IGNORE INTO jobs (id, filename, user, url, status) VALUES (?, ?, ?, ?, ?)",
+        (job_id, filename, user, url, "uploaded")
+    )
+    invalidate_jobs_cache()
+    _info("[UPLOAD] %s uploaded by %s", filename, user)
+    return {"ok": True, "id": job_id, "path": url, "user": user}
 
 @app.post("/upload")
 async def upload(image: UploadFile = File(...), user: str = Form("Anonymous")):
@@ -107,110 +288,156 @@ async def upload(image: UploadFile = File(...), user: str = Form("Anonymous")):
     filename = f"{job_id}_{image.filename}"
 
     try:
-        s3.upload_fileobj(
-            io.BytesIO(await image.read()),
+        await app.state.s3.upload_fileobj(
+            image,
             BUCKET,
             filename,
-            ExtraArgs={"ContentType": image.content_type},
+            ExtraArgs={"ContentType": image.content_type, "CacheControl": PHOTO_CACHE_CONTROL},
+            Config=S3_TRANSFER,
         )
-        url = f"https://{BUCKET}.s3.amazonaws.com/{filename}"
-        db_query(
-            "INSERT INTO jobs (id, filename, user, url, status) VALUES (?, ?, ?, ?, ?)",
-            (job_id, filename, user, url, "uploaded")
-        )
-        logger.info(f"[UPLOAD] {filename} uploaded by {user}")
-        return {"ok": True, "id": job_id, "path": url, "user": user}
+        return await asyncio.to_thread(record_upload, job_id, filename, user)
     except ClientError as e:
-        logger.error(f"[UPLOAD ERROR] {filename}: {e}")
+        _err("[UPLOAD ERROR] %s: %s", filename, e)
         return {"ok": False, "error": str(e)}
 
+# Direct-to-S3 uploads: the browser gets a presigned POST from /presign, sends the
+# photo straight to the bucket, then reports back to /upload-complete. Photo bytes
+# never pass through this server. /upload stays as the fallback path.
+PRESIGN_MAX_BYTES = 50_000_000
+PRESIGN_EXPIRES_S = 300
+
+@app.post("/presign")
+async def presign(filename: str = Form(...), content_type: str = Form("image/jpeg")):
+    """Return a presigned S3 POST for one photo."""
+    if not content_type.startswith("image/"):
+        return OrjsonResponse({"ok": False, "error": "Only images can be uploaded"}, status_code=400)
+    job_id = str(uuid.uuid4())
+    key = f"{job_id}_{os.path.basename(filename)}"
+    post = await app.state.s3.generate_presigned_post(
+        Bucket=BUCKET,
+        Key=key,
+        Fields={"Content-Type": content_type, "Cache-Control": PHOTO_CACHE_CONTROL},
+        Conditions=[
+            {"Content-Type": content_type},
+            {"Cache-Control": PHOTO_CACHE_CONTROL},
+            ["content-length-range", 1, PRESIGN_MAX_BYTES],
+        ],
+        ExpiresIn=PRESIGN_EXPIRES_S,
+    )
+    return {"ok": True, "id": job_id, "key": key, "url": post["url"], "fields": post["fields"]}
+
+@app.post("/upload-complete")
+async def upload_complete(key: str = Form(...), user: str = Form("Anonymous")):
+    """Queue a job for a photo the browser uploaded straight to S3."""
+    job_id = key.split("_", 1)[0]
+    try:
+        uuid.UUID(job_id)
+        # Only register objects that actually landed in the bucket.
+        await app.state.s3.head_object(Bucket=BUCKET, Key=key)
+    except (ValueError, ClientError) as e:
+        _warn("[UPLOAD] Rejected completion for %s: %s", key, e)
+        return OrjsonResponse({"ok": False, "error": "Upload not found"}, status_code=404)
+    return await asyncio.to_thread(record_upload, job_id, key, user)
+
+def _jobs_payload():
+    rows = db_query("SELECT id, filename, user, url, status, created_at FROM jobs ORDER BY created_at DESC", fetch=True)
+    return {"jobs": [dict(r) for r in rows]}
+
 @app.get("/jobs")
-def list_jobs():
+def list_jobs(request: Request):
     """View all jobs."""
-    rows = db_query("SELECT id, filename, user, url, status, created_at FROM jobs ORDER BY created_at DESC", fetch=True)
-    return {"jobs": [dict(zip(["id", "filename", "user", "url", "status", "created_at"], r)) for r in rows]}
+    return cached_json(request, JOBS_KEY, _jobs_payload)
 
 @app.post("/print/{job_id}")
 def trigger_print(job_id: str):
     """Mark a specific uploaded job as ready to print."""
     rows = db_query("SELECT id FROM jobs WHERE id = ?", (job_id,), fetch=True)
     if not rows:
-        logger.warning(f"[PRINT] Job ID not found: {job_id}")
-        return JSONResponse({"ok": False, "error": "Job not found"}, status_code=404)
+        _warn("[PRINT] Job ID not found: %s", job_id)
+        return OrjsonResponse({"ok": False, "error": "Job not found"}, status_code=404)
 
     db_query("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
-    logger.info(f"[PRINT] Job {job_id} manually triggered for printing.")
+    invalidate_jobs_cache()
+    notify_job_queued()
+    _info("[PRINT] Job %s manually triggered for printing.", job_id)
     return {"ok": True, "message": "Job queued for printing."}
 
 
 
-@app.get("/next-job")
-def next_job():
-    """Printer polls for next queued job."""
+def claim_next_job():
+    """Mark the oldest queued job as printing and return it (None if the queue is empty).
+
+    One UPDATE ... RETURNING statement, so two printers (or workers) can never
+    claim the same job. Needs SQLite >= 3.35.
+    """
     rows = db_query("""
-        SELECT id, filename, user, url
-        FROM jobs
-        WHERE status = 'queued'
-        ORDER BY created_at ASC
-        LIMIT 1
+        UPDATE jobs SET status = 'printing'
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE status = 'queued'
+            ORDER BY created_at ASC
+            LIMIT 1
+        )
+        RETURNING id, filename, user, url
     """, fetch=True)
 
     if not rows:
-        return {"id": None, "filename": None, "user": None, "url": None}
+        return None
 
-    job = dict(zip(["id", "filename", "user", "url"], rows[0]))
-    db_query("UPDATE jobs SET status = 'printing' WHERE id = ?", (job["id"],))
-    logger.info(f"[DISPATCH] Job {job['id']} sent to printer.")
+    job = dict(rows[0])
+    invalidate_jobs_cache()
+    _info("[DISPATCH] Job %s sent to printer.", job['id'])
     return job
 
+@app.get("/next-job")
+def next_job():
+    """Printer polls for next queued job."""
+    return claim_next_job() or {"id": None, "filename": None, "user": None, "url": None}
+
 
 @app.post("/mark-printed/{job_id}")
 def mark_printed(job_id: str):
     """Printer confirms successful print."""
     db_query("UPDATE jobs SET status = 'printed' WHERE id = ?", (job_id,))
-    logger.info(f"[PRINTED] Job {job_id} marked complete")
+    invalidate_jobs_cache()
+    _info("[PRINTED] Job %s marked complete", job_id)
     return {"ok": True}
 
 
+def _gallery_payload():
+    rows = db_query("""
+        SELECT url AS path, COALESCE(NULLIF(user, ''), 'Anonymous') AS user, status, created_at
+        FROM jobs ORDER BY created_at DESC
+    """, fetch=True)
+    images = [dict(r) for r in rows]
+    _info("[GALLERY] Returned %d images from DB.", len(images))
+    return {"images": images}
+
 @app.get("/gallery")
-def gallery():
+def gallery(request: Request):
     """Return all uploaded images (persistent via DB)."""
     try:
-        rows = db_query(
-            "SELECT url, user, status, created_at FROM jobs ORDER BY created_at DESC",
-            fetch=True
-        )
-        images = [
-            {
-                "path": r[0],
-                "user": r[1] or "Anonymous",
-                "status": r[2],
-                "created_at": r[3]
-            }
-            for r in rows
-        ]
-        logger.info(f"[GALLERY] Returned {len(images)} images from DB.")
-        return {"images": images}
+        return cached_json(request, GALLERY_KEY, _gallery_payload, max_age=2)
     except Exception as e:
-        logger.error(f"[GALLERY ERROR] {e}")
-        logger.error(traceback.format_exc())
+        _exc("[GALLERY ERROR] %s", e)
         return {"error": str(e), "images": []}
     
 
 from fastapi.responses import FileResponse
 
 @app.get("/admin/jobs")
-def admin_jobs():
+def admin_jobs(request: Request):
     """Return all jobs for the admin dashboard."""
-    rows = db_query("SELECT id, filename, user, url, status, created_at FROM jobs ORDER BY created_at DESC", fetch=True)
-    return {"jobs": [dict(zip(["id", "filename", "user", "url", "status", "created_at"], r)) for r in rows]}
+    return cached_json(request, JOBS_KEY, _jobs_payload)
 
 
 @app.post("/admin/print/{job_id}")
 def admin_trigger_print(job_id: str):
     """Queue job for print (admin trigger)."""
     db_query("UPDATE jobs SET status = 'queued' WHERE id = ?", (job_id,))
-    logger.info(f"[ADMIN] Job {job_id} queued for print.")
+    invalidate_jobs_cache()
+    notify_job_queued()
+    _info("[ADMIN] Job %s queued for print.", job_id)
     return {"ok": True}
 
 
@@ -218,58 +445,260 @@ def admin_trigger_print(job_id: str):
 def admin_mark_printed(job_id: str):
     """Mark job as printed (admin confirm)."""
     db_query("UPDATE jobs SET status = 'printed' WHERE id = ?", (job_id,))
-    logger.info(f"[ADMIN] Job {job_id} marked printed.")
+    invalidate_jobs_cache()
+    _info("[ADMIN] Job %s marked printed.", job_id)
     return {"ok": True}
 
 
+def delete_job_row(job_id):
+    db_query("DELETE FROM jobs WHERE id = ?", (job_id,))
+    invalidate_jobs_cache()
+
 @app.delete("/admin/delete/{job_id}")
-def admin_delete_job(job_id: str):
+async def admin_delete_job(job_id: str):
     """Delete job from DB and S3."""
-    row = db_query("SELECT filename FROM jobs WHERE id = ?", (job_id,), fetch=True)
+    # S3 is awaited on the loop; the blocking SQLite/Redis calls go to a thread.
+    row = await asyncio.to_thread(db_query, "SELECT filename FROM jobs WHERE id = ?", (job_id,), True)
     if not row:
-        return JSONResponse({"ok": False, "error": "Job not found"}, status_code=404)
+        return OrjsonResponse({"ok": False, "error": "Job not found"}, status_code=404)
     filename = row[0][0]
 
     # Delete from S3
     try:
-        s3.delete_object(Bucket=BUCKET, Key=filename)
-        logger.info(f"[ADMIN] Deleted {filename} from S3.")
+        await app.state.s3.delete_object(Bucket=BUCKET, Key=filename)
+        _info("[ADMIN] Deleted %s from S3.", filename)
     except Exception as e:
-        logger.warning(f"[ADMIN] Could not delete {filename} from S3: {e}")
+        _warn("[ADMIN] Could not delete %s from S3: %s", filename, e)
 
     # Delete DB record
-    db_query("DELETE FROM jobs WHERE id = ?", (job_id,))
-    logger.info(f"[ADMIN] Job {job_id} deleted from DB.")
+    await asyncio.to_thread(delete_job_row, job_id)
+    _info("[ADMIN] Job %s deleted from DB.", job_id)
     return {"ok": True}
 
 
 
 # -------------------------------------------------------------------
-# Flask bridge for live log streaming
+# Printer job push (WebSocket)
 # -------------------------------------------------------------------
-flask_bridge = Flask(__name__)
+# The printer holds one /printer socket open and is sent each job as it is queued,
+# instead of polling /next-job. Queueing through this process wakes the socket at
+# once; jobs queued elsewhere (admin.py, other workers) are picked up on a recheck.
+PRINTER_RECHECK_S = 1.0
+# The client refuses bigger frames (polling_script.MAX_PHOTO_BYTES) by closing the socket.
+PRINTER_MAX_PHOTO_BYTES = 50_000_000
+job_queued = asyncio.Event()
+_loop = None
+
+@app.on_event("startup")
+async def capture_loop():
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+def notify_job_queued():
+    """Wake /printer sockets; safe to call from the threadpool running sync routes."""
+    if _loop is not None:
+        _loop.call_soon_threadsafe(job_queued.set)
+
+def set_job_status(job_id, status):
+    db_query("UPDATE jobs SET status = ? WHERE id = ?", (status, job_id))
+    invalidate_jobs_cache()
+
+@app.websocket("/printer")
+async def printer_socket(ws: WebSocket):
+    """Push each queued job over one socket: a JSON header, then the photo as a binary frame.
+
+    SQLite and Redis are blocking, so claims and status updates run in a thread.
+    The printer answers every job with {"id": ..., "printed": true|false} before the
+    next one is sent. A job whose ack never arrives (disconnect) is re-queued. One
+    that failed to print, or whose photo can't be read from S3 or is too big to send,
+    goes back to 'uploaded' for an admin to re-queue, so it can't spin at the head
+    of the queue.
+    """
+    await ws.accept()
+    job = None
+    try:
+        while True:
+            job_queued.clear()
+            job = await asyncio.to_thread(claim_next_job)
+            if not job:
+                try:
+                    await asyncio.wait_for(job_queued.wait(), PRINTER_RECHECK_S)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                obj = await app.state.s3.get_object(Bucket=BUCKET, Key=job["filename"])
+                async with obj["Body"] as body:
+                    if obj["ContentLength"] > PRINTER_MAX_PHOTO_BYTES:
+                        raise ValueError("%d bytes is over the printer's limit" % obj["ContentLength"])
+                    image = await body.read()
+            except Exception as e:
+                _warn("[PRINTER] Can't send %s to the printer: %s", job["filename"], e)
+                await asyncio.to_thread(set_job_status, job["id"], "uploaded")
+                job = None
+                continue
+
+            await ws.send_json({"id": job["id"], "user": job["user"]})
+            await ws.send_bytes(image)
+            ack = await ws.receive_json()
+            if ack.get("id") == job["id"] and ack.get("printed"):
+                await asyncio.to_thread(set_job_status, job["id"], "printed")
+                _info("[PRINTED] Job %s marked complete", job["id"])
+            else:
+                await asyncio.to_thread(set_job_status, job["id"], "uploaded")
+                _warn("[PRINTER] Job %s failed to print.", job["id"])
+            job = None
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if job:
+            await asyncio.to_thread(set_job_status, job["id"], "queued")
+            _warn("[PRINTER] Printer went away mid-job; job %s re-queued.", job["id"])
 
-@flask_bridge.route("/logs")
-def stream_logs():
-    """Server-Sent Events for real-time logs."""
-    def generate():
-        if not os.path.exists(LOG_PATH):
-            yield "data: (no log file yet)\n\n"
+# -------------------------------------------------------------------
+# Live log streaming (SSE)
+# -------------------------------------------------------------------
+SSE_KEEPALIVE_S = 15
+LOG_REOPEN_S = 0.1  # retry interval while a rotated log's replacement doesn't exist yet
+
+class LogTailer:
+    """One inotify watch on the event loop, fanning new log lines out to every SSE client's queue."""
+
+    def __init__(self, path):
+        self.path = path
+        self._clients = set()
+        self._ino = None
+        self._fd = None
+        self._buf = b""
+        self._flush_handle = None
+        self._reopen_handle = None
+
+    def subscribe(self):
+        if self._ino is None:
+            self._start()
+        q = asyncio.Queue(maxsize=256)
+        self._clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self._clients.discard(q)
+        if not self._clients and self._ino is not None:
+            self._stop()
+
+    def _start(self):
+        self._ino = INotify()
+        asyncio.get_running_loop().add_reader(self._ino.fileno(), self._on_events)
+        if not self._open(seek_end=True):
+            self._reopen_later()
+
+    def _stop(self):
+        asyncio.get_running_loop().remove_reader(self._ino.fileno())
+        for handle in (self._flush_handle, self._reopen_handle):
+            if handle:
+                handle.cancel()
+        self._flush_handle = self._reopen_handle = None
+        if self._fd is not None:
+            os.close(self._fd)
+        self._ino.close()
+        self._ino = self._fd = None
+        self._buf = b""
+
+    def _open(self, seek_end=False):
+        """Open and watch the log file; False if it doesn't exist (yet)."""
+        try:
+            fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        except FileNotFoundError:
+            return False
+        if seek_end:
+            os.lseek(fd, 0, os.SEEK_END)
+        self._fd = fd
+        self._wd = self._ino.add_watch(self.path, LOG_WATCH_FLAGS)
+        return True
+
+    def _reopen_later(self):
+        self._reopen_handle = asyncio.get_running_loop().call_later(LOG_REOPEN_S, self._reopen)
+
+    def _reopen(self):
+        # Between a rotation's rename and the next write (possibly by another worker)
+        # the path doesn't exist; keep checking, as admin.py's tailer does.
+        self._reopen_handle = None
+        if not self._open():
+            self._reopen_later()
+        elif self._flush_handle is None:
+            # Lines written before the watch was added raise no event; pick them up now.
+            self._flush_handle = asyncio.get_running_loop().call_later(SSE_DEBOUNCE_S, self._flush)
+
+    def _on_events(self):
+        events = self._ino.read(timeout=0)
+        if any(e.mask & flags.MOVE_SELF for e in events):
+            # Rotated: flush what's left of the old file, then follow the new one.
+            self._buf += read_available(self._fd)
+            self._broadcast(self._buf.rstrip(b"\n"))
+            self._buf = b""
+            os.close(self._fd)
+            self._fd = None
+            self._ino.rm_watch(self._wd)
+            self._reopen()
             return
-        with open(LOG_PATH, "r") as f:
-            f.seek(0, os.SEEK_END)
-            while True:
-                line = f.readline()
-                if line:
-                    yield f"data: {line.strip()}\n\n"
-                time.sleep(0.5)
-    return Response(generate(), mimetype="text/event-stream")
+        # Debounce: let a burst of writes land so it goes out as one event.
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(SSE_DEBOUNCE_S, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._fd is None:
+            return  # rotated; _reopen() flushes once the new file is open
+        self._buf += read_available(self._fd)
+        if b"\n" in self._buf:
+            lines, self._buf = self._buf.rsplit(b"\n", 1)
+            self._broadcast(lines)
+
+    def _broadcast(self, lines):
+        if not lines:
+            return
+        for q in self._clients:
+            try:
+                q.put_nowait(lines)
+            except asyncio.QueueFull:
+                pass  # slow client; it will pick up later batches
+
+log_tailer = LogTailer(LOG_PATH)
 
-app.mount("/admin", WSGIMiddleware(flask_bridge))
+@app.get("/admin/logs")
+async def stream_logs():
+    """Server-Sent Events for real-time logs."""
+    if not LOG_PATH.exists():
+        return Response(b"data: (no log file yet)\n\n", media_type="text/event-stream")
+
+    async def generate():
+        q = log_tailer.subscribe()
+        try:
+            while True:
+                try:
+                    lines = await asyncio.wait_for(q.get(), SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield sse_event(lines)
+        finally:
+            log_tailer.unsubscribe(q)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=headers)
 
 # -------------------------------------------------------------------
 # Run server
 # -------------------------------------------------------------------
+# Needs `pip install uvloop httptools`; under gunicorn (gunicorn.conf.py) the uvicorn
+# worker picks both up automatically once installed.
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5050)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=5050,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count())),
+    )
@@ -1,41 +1,38 @@
 #!/usr/bin/env python3
-import requests, time, os, subprocess
-from pathlib import Path
+import asyncio, json, os
+import websockets
 
 SERVER = "https://party.emits.ai"  # main app domain
-DOWNLOAD_DIR = Path("/tmp/partyprints")
-DOWNLOAD_DIR.mkdir(exist_ok=True)
+PRINTER = os.getenv("PRINTER")  # CUPS destination; unset = system default
 
-def download_and_print(url, job_id):
-    """Download the image and send to local printer"""
-    local_path = DOWNLOAD_DIR / f"{job_id}.jpg"
-    r = requests.get(url, stream=True)
-    if r.status_code == 200:
-        with open(local_path, "wb") as f:
-            for chunk in r.iter_content(1024):
-                f.write(chunk)
-        print(f"📥 Downloaded {local_path}")
-        # print using system command (CUPS / lp)
-        subprocess.run(["lp", str(local_path)])
-        print("🖨️ Sent to printer.")
-        requests.post(f"{SERVER}/mark-printed/{job_id}")
-    else:
-        print(f"⚠️ Failed to download {url} (status {r.status_code})")
+# One WebSocket to the server: it pushes each job as a JSON header followed by the
+# photo itself as a binary frame, and we answer with an ack -- no polling, no S3
+# download, no mark-printed request.
+PRINTER_WS = SERVER.replace("https://", "wss://", 1) + "/printer"
+MAX_PHOTO_BYTES = 50_000_000  # main.PRINTER_MAX_PHOTO_BYTES; the server skips bigger photos
 
-def main():
-    print("🎉 PartyPrint client started — polling for print jobs...")
+async def send_to_printer(image, job_id):
+    """Pipe the image to lp on stdin -- nothing is written to disk"""
+    cmd = ["lp", "-t", job_id] + (["-d", PRINTER] if PRINTER else [])
+    proc = await asyncio.create_subprocess_exec(*cmd, stdin=asyncio.subprocess.PIPE)
+    await proc.communicate(image)
+    return proc.returncode == 0
+
+async def main():
+    print("🎉 PartyPrint client started — waiting for print jobs...")
     while True:
         try:
-            r = requests.get(f"{SERVER}/next-job", timeout=10)
-            job = r.json()
-            if job.get("id"):
-                print(f"🆕 Printing job {job['id']} from {job['user']}")
-                download_and_print(job["url"], job["id"])
-            else:
-                time.sleep(3)
+            async with websockets.connect(PRINTER_WS, max_size=MAX_PHOTO_BYTES) as ws:
+                while True:
+                    job = json.loads(await ws.recv())
+                    image = await ws.recv()
+                    print(f"🆕 Printing job {job['id']} from {job['user']} ({len(image)} bytes)")
+                    printed = await send_to_printer(image, job["id"])
+                    print("🖨️ Sent to printer." if printed else f"⚠️ lp failed for job {job['id']}")
+                    await ws.send(json.dumps({"id": job["id"], "printed": printed}))
         except Exception as e:
-            print("❌ Error polling:", e)
-            time.sleep(5)
+            print("❌ Printer socket error:", e)
+        await asyncio.sleep(5)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())